@@ -1,11 +1,12 @@
 """
 Interfaces y protocolos para la capa de aplicación del ETL
 """
-from typing import Protocol, List, Dict, Any
+from typing import Protocol, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from etl_domain import CourseMetadata, Course
 
 class PDFExtractor(Protocol):
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> Tuple[List[str], Dict[str, List[List[str]]]]: ...
     def extract_text(self, filepath: Path) -> List[str]: ...
     def extract_tables(self, filepath: Path) -> Dict[str, List[List[str]]]: ...
 
@@ -15,5 +16,6 @@ class SyllabusParser(Protocol):
 
 class Repository(Protocol):
     def save(self, course: Course) -> None: ...
+    def save_many(self, courses: List[Course], filename: str = "all_courses.json") -> Path: ...
     def find_by_id(self, course_id: str) -> Course | None: ...
     def find_by_period(self, period: str) -> List[Course]: ...
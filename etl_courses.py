@@ -5,14 +5,33 @@ from pathlib import Path
 import argparse
 from etl_pipeline import PipelineFactory
 
+def positive_int(value: str) -> int:
+    """argparse type for options that need an integer of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="ETL Pipeline for UPC Syllabi")
     parser.add_argument("input_dir", type=Path, help="Directory containing PDF files")
     parser.add_argument("output_dir", type=Path, help="Output directory for JSON files")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--max-workers", type=positive_int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--extractor", choices=["pdfplumber", "pdfium"], default="pdfplumber",
+                        help="PDF text backend; pdfium reads text in C and uses pdfplumber only for table pages")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extract every PDF instead of reusing .etl_cache")
+    parser.add_argument("--no-course-files", action="store_true",
+                        help="Only write all_courses.json, skipping the per-course JSON files")
     args = parser.parse_args()
+    if not args.input_dir.is_dir():
+        parser.error(f"input directory not found: {args.input_dir}")
 
-    pipeline = PipelineFactory.create_default_pipeline(args.output_dir)
+    pipeline = PipelineFactory.create_default_pipeline(args.output_dir, max_workers=args.max_workers,
+                                                       extractor=args.extractor,
+                                                       cache_dir=None if args.no_cache else Path(".etl_cache"),
+                                                       verbose=args.verbose,
+                                                       save_course_files=not args.no_course_files)
     courses = pipeline.process_directory(args.input_dir)
     print(f"Processed {len(courses)} courses successfully")
 
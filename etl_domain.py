@@ -4,13 +4,13 @@ Entidades de dominio y value objects para el ETL de sílabos UPC
 from dataclasses import dataclass, field
 from typing import List, Tuple
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CourseMetadata:
     course_id: str
     nrc: str
     period: str
 
-@dataclass
+@dataclass(slots=True)
 class Unit:
     number: int
     title: str
@@ -19,7 +19,7 @@ class Unit:
     syllabus: List[str] = field(default_factory=list)
     activities: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Assessment:
     name: str
     code: str
@@ -27,7 +27,7 @@ class Assessment:
     week: int
     is_recoverable: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Course:
     metadata: CourseMetadata
     name: str
@@ -1,103 +1,272 @@
 """
 Implementaciones concretas de extracción, parsing y persistencia
 """
+from datetime import date
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import io
+import logging
+import os
+import re
+from importlib.metadata import version
+import pdfplumber
+import pypdfium2 as pdfium
 from etl_domain import CourseMetadata, Course, Unit, Assessment
+from etl_application import PDFExtractor
+
+# orjson es opcional: serializa en C, con json de la librería estándar como respaldo
+try:
+    import orjson
+
+    def _dumps(data: Any, indent: bool = True) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(data: Any, indent: bool = True) -> bytes:
+        if not indent:
+            return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+    _loads = json.loads
+
+# Lista de nombres de secciones para detectar contexto
+SECTION_NAMES = ["I. INFORMACIÓN GENERAL", "II. MISIÓN Y VISIÓN DE LA UPC", "III. INTRODUCCIÓN", 
+                 "IV. LOGRO (S) DEL CURSO", "V. COMPETENCIAS (S) DEL CURSO", "VI. UNIDADES DE APRENDIZAJE", 
+                 "VII. METODOLOGÍA", "VIII. EVALUACIÓN", "IX. BIBLIOGRAFÍA DEL CURSO", 
+                 "X. RECURSOS TECNOLÓGICOS", "XI. Anexos"]
+_SECTION_NAMES_SET = frozenset(SECTION_NAMES)
+
+# Secciones del sílabo que contienen las tablas que se procesan
+TABLE_SECTIONS = {"VI. UNIDADES DE APRENDIZAJE", "VIII. EVALUACIÓN"}
+TABLE_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+
+# Secciones finales del sílabo: no aportan datos, las páginas siguientes no se leen
+TRAILING_SECTIONS = {"IX. BIBLIOGRAFÍA DEL CURSO", "X. RECURSOS TECNOLÓGICOS", "XI. Anexos"}
+
+# Nombre de archivo de los sílabos, p. ej. UG-202520_1AEL0244-8281.pdf: posiciones fijas, 27 caracteres
+_FILENAME_LENGTH = 27
+_COURSE_ID_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-")
+
+# Patrones precompilados para el parsing de la información general
+_GENERAL_INFO_LABELS = ("Nombre del Curso", "Código del curso", "Periodo", "Cuerpo académico",
+                        "Créditos", "Semanas", "NRC")
+# Todas las etiquetas en una sola alternancia; el valor va en un lookahead para no consumirlo
+_LABELS_PATTERN = re.compile(rf"(?P<label>{'|'.join(_GENERAL_INFO_LABELS)})\s*[:\-](?=\s*(?P<value>.+))",
+                             re.IGNORECASE)
+_LABEL_KEYS = {label.lower(): label for label in _GENERAL_INFO_LABELS}
+_AREAS_PATTERN = re.compile(r"\n:\s*(?P<area_1>[^\n]+)\nÁrea o programa[ \t]*(?P<area_2>[^\n]*)\n", re.MULTILINE)
+# Viñetas y comas separan los elementos de una lista; se unifican en "\uf0b7" para un solo split
+_BULLET_SEPARATOR = "\uf0b7"
+_BULLET_TRANSLATION = str.maketrans({"•": _BULLET_SEPARATOR, ",": _BULLET_SEPARATOR})
 
 class PDFPlumberExtractor:
-    def extract_text(self, filepath: Path) -> List[str]:
-        import pdfplumber
-        pages_text = []
-        with pdfplumber.open(filepath) as pdf:
+    # Bibliotecas de las que depende el resultado; forman parte de la clave de caché
+    backend_versions = f"pdfplumber_{pdfplumber.__version__}"
+
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+        """Extract the page text and the section tables opening the PDF once.
+
+        If the file contents are already in memory they can be passed as ``data`` so the file is not read again.
+        Pages after the start of the trailing sections (bibliography onwards) are not read.
+        """
+        pages_text, units_table, assessments_table = [], [], []
+        
+        with pdfplumber.open(io.BytesIO(data) if data is not None else filepath) as pdf:
+            current_sections = []
             for page in pdf.pages:
                 text = page.extract_text() or ""
                 pages_text.append(text)
-        return pages_text
+                current_sections = self._track_sections(text, current_sections, page.page_number)
+
+                # Solo buscar tablas en las secciones que las usan; la detección es costosa
+                if TABLE_SECTIONS.intersection(current_sections):
+                    self._collect_table(page, current_sections, units_table, assessments_table)
+
+                # Liberar los objetos cacheados de la página antes de pasar a la siguiente
+                page.close()
+
+                if TRAILING_SECTIONS.intersection(current_sections):
+                    break
+        
+        return pages_text, {"units": units_table, "assessments": assessments_table}
+
+    def extract_text(self, filepath: Path) -> List[str]:
+        return self.extract(filepath)[0]
 
     def extract_tables(self, filepath: Path) -> Dict[str, List[List[str]]]:
-        import pdfplumber
-        units_table, assessments_table = [], []
+        return self.extract(filepath)[1]
+
+    def _track_sections(self, text: str, current_sections: List[str], page_number: int) -> List[str]:
+        """Return the sections in effect at the end of a page given its text"""
+        lines = text.split("\n") if text else []
         
-        # Lista de nombres de secciones para detectar contexto
-        SECTION_NAMES = ["I. INFORMACIÓN GENERAL", "II. MISIÓN Y VISIÓN DE LA UPC", "III. INTRODUCCIÓN", 
-                        "IV. LOGRO (S) DEL CURSO", "V. COMPETENCIAS (S) DEL CURSO", "VI. UNIDADES DE APRENDIZAJE", 
-                        "VII. METODOLOGÍA", "VIII. EVALUACIÓN", "IX. BIBLIOGRAFÍA DEL CURSO", 
-                        "X. RECURSOS TECNOLÓGICOS", "XI. Anexos"]
+        # Detectar las secciones presentes en esta página
+        if lines and lines[0] in _SECTION_NAMES_SET:  # La página empieza con una sección
+            current_sections = [lines[0]]
+        else:
+            if page_number > 1 and current_sections:
+                # Continuar con la última sección de la página anterior
+                current_sections = current_sections[-1:]
+            else:  # La primera página empieza "Sílabo de Curso", no con el título de una sección
+                current_sections = []
+        
+        for line in lines[1:]:
+            if line in _SECTION_NAMES_SET:
+                current_sections = [line.strip()]
+        return current_sections
+
+    def _collect_table(self, page, current_sections: List[str],
+                       units_table: List[List[str]], assessments_table: List[List[str]]) -> None:
+        # Si hay tabla, ver a qué sección corresponde
+        if (table := page.extract_table(table_settings=TABLE_SETTINGS)):
+            if "VI. UNIDADES DE APRENDIZAJE" in current_sections:
+                units_table.extend(table)
+            elif "VIII. EVALUACIÓN" in current_sections:
+                assessments_table.extend(table)
+
+class PDFiumExtractor(PDFPlumberExtractor):
+    """Read page text with PDFium (C) and open pdfplumber only on the table pages.
+
+    Falls back to the full pdfplumber extraction when PDFium returns no text at all.
+    """
+    backend_versions = f"pdfplumber_{pdfplumber.__version__}-pypdfium2_{version('pypdfium2')}"
 
-        with pdfplumber.open(filepath) as pdf:
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+        pages_text, table_pages = [], {}
+        # PDFium y pdfplumber abren el mismo archivo: se lee una sola vez
+        if data is None:
+            data = filepath.read_bytes()
+        
+        pdf = pdfium.PdfDocument(data)
+        try:
             current_sections = []
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                lines = text.splitlines() if text else []
+            for page_number, page in enumerate(pdf, start=1):
+                textpage = page.get_textpage()
+                text = textpage.get_text_range().replace("\r\n", "\n")
+                textpage.close()
+                page.close()
+                pages_text.append(text)
+                current_sections = self._track_sections(text, current_sections, page_number)
                 
-                # Detectar las secciones presentes en esta página
-                if lines and lines[0] in SECTION_NAMES:  # La página empieza con una sección
-                    current_sections = [lines[0]]
-                else:
-                    if page.page_number > 1 and current_sections:
-                        # Continuar con la última sección de la página anterior
-                        current_sections = current_sections[-1:]
-                    else:  # La primera página empieza "Sílabo de Curso", no con el título de una sección
-                        current_sections = []
+                if TABLE_SECTIONS.intersection(current_sections):
+                    table_pages[page_number] = current_sections
                 
-                for line in lines[1:]:
-                    if line in SECTION_NAMES:
-                        current_sections = [line.strip()]
-
-                # Si hay tabla, ver a qué sección corresponde
-                if (table := page.extract_table()):
-                    if "VI. UNIDADES DE APRENDIZAJE" in current_sections:
-                        units_table.extend(table)
-                    elif "VIII. EVALUACIÓN" in current_sections:
-                        assessments_table.extend(table)
+                if TRAILING_SECTIONS.intersection(current_sections):
+                    break
+        finally:
+            pdf.close()
         
-        return {"units": units_table, "assessments": assessments_table}
+        # Sin texto de PDFium (p. ej. fuentes sin mapa Unicode): usar el extractor completo de pdfplumber
+        if not any(text.strip() for text in pages_text):
+            return super().extract(filepath, data)
+        
+        units_table, assessments_table = [], []
+        if table_pages:
+            with pdfplumber.open(io.BytesIO(data), pages=list(table_pages)) as plumber_pdf:
+                for page in plumber_pdf.pages:
+                    self._collect_table(page, table_pages[page.page_number], units_table, assessments_table)
+                    page.close()
+        
+        return pages_text, {"units": units_table, "assessments": assessments_table}
+
+_logger = logging.getLogger("ETL.cache")
+
+# Versión del formato y la lógica de extracción guardados en caché; incrementarla al cambiar los extractores
+_CACHE_VERSION = 1
+
+class CachingExtractor:
+    """Keep each extraction result on disk as JSON.
+
+    Entries are keyed by the extractor, the extraction version, the PDF library versions and the SHA-256 of the PDF.
+    """
+    def __init__(self, extractor: PDFExtractor, cache_dir: Path):
+        self.extractor = extractor
+        self.cache_dir = cache_dir
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            _logger.warning(f"Cache directory {cache_dir} is not available, extracting without cache: {e}")
+
+    def extract(self, filepath: Path, data: Optional[bytes] = None) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+        if data is None:
+            data = filepath.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        backend_versions = getattr(self.extractor, "backend_versions", "")
+        extractor_key = f"{type(self.extractor).__name__}-v{_CACHE_VERSION}-{backend_versions}"
+        cache_file = self.cache_dir / f"{extractor_key}-{digest}.json"
+        if cache_file.exists():
+            try:
+                pages_text, tables = _loads(cache_file.read_bytes())
+                return pages_text, tables
+            except (OSError, ValueError, TypeError) as e:
+                _logger.warning(f"Ignoring unreadable cache entry {cache_file.name}: {e}")
+
+        # El extractor recibe los bytes ya leídos para el hash
+        result = self.extractor.extract(filepath, data)
+        # Escribir a un temporal y renombrar, para que otro proceso nunca lea un archivo a medias
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_file.write_bytes(_dumps(result, indent=False))
+            tmp_file.replace(cache_file)
+        except OSError as e:
+            # Sin caché el resultado sigue siendo válido
+            _logger.warning(f"Could not write cache entry {cache_file.name}: {e}")
+            try:
+                tmp_file.unlink(missing_ok=True)
+            except OSError:
+                pass  # El directorio de caché ya no existe
+        return result
+
+    def extract_text(self, filepath: Path) -> List[str]:
+        return self.extract(filepath)[0]
+
+    def extract_tables(self, filepath: Path) -> Dict[str, List[List[str]]]:
+        return self.extract(filepath)[1]
 
 class UPCSyllabusParser:
     def parse_metadata(self, filename: str) -> CourseMetadata:
-        import re
-        pattern = re.compile(r"^UG-(?P<period>\d{5})0_(?P<id>[A-Z0-9_\-]{8})-(?P<nrc>\d{4})\.pdf$")
-        if match := pattern.match(filename):
-            data = match.groupdict()
-            year = data['period'][:4]
-            term = data['period'][4:]
+        # UG-{period}0_{id}-{nrc}.pdf has a fixed layout, so slicing is enough to split it
+        period, course_id, nrc = filename[3:8], filename[10:18], filename[19:23]
+        if (len(filename) == _FILENAME_LENGTH and filename.startswith("UG-") and filename[8:10] == "0_"
+                and filename[18] == "-" and filename.endswith(".pdf")
+                and period.isascii() and period.isdigit() and nrc.isascii() and nrc.isdigit()
+                and _COURSE_ID_CHARS.issuperset(course_id)):
             return CourseMetadata(
-                course_id=data['id'],
-                nrc=data['nrc'],
-                period=f"{year}-{term}"
+                course_id=course_id,
+                nrc=nrc,
+                period=f"{period[:4]}-{period[4:]}"
             )
         raise ValueError(f"Invalid filename format: {filename}")
 
     def parse_content(self, text: List[str], tables: Dict) -> Dict[str, Any]:
         """Parse content from syllabus text and tables"""
         
-        def parse_general_info(text_pages: List[str]) -> Dict[str, Any]:
-            """Extract general information from syllabus text"""
-            # Join all pages and find the general info section
-            full_text = "\n".join(text_pages)
-            
-            # Extract the "I. INFORMACIÓN GENERAL" section
-            section_start = full_text.find("I. INFORMACIÓN GENERAL")
-            if section_start == -1:
-                return {}
-            
-            section_end = full_text.find("II. MISIÓN Y VISIÓN", section_start)
-            if section_end == -1:
-                section_end = len(full_text)
-            
-            general_info_text = full_text[section_start:section_end]
-            
+        def parse_general_info(general_info_text: str) -> Dict[str, Any]:
+            """Extract general information from the "I. INFORMACIÓN GENERAL" section"""
             out = {}
             if not general_info_text:
                 return out
 
-            # Search for specific patterns
+            # Read every "Etiqueta : valor" line in a single pass
+            labelled_values = {}
+            for line in general_info_text.split("\n"):
+                head, sep, value = line.partition(":")
+                label = _LABEL_KEYS.get(head.strip().lower())
+                if sep and label and label not in labelled_values and value.strip():
+                    labelled_values[label] = value.strip()
+
+            # Fall back to one sweep of the label pattern for values not laid out on one line
+            if len(labelled_values) < len(_GENERAL_INFO_LABELS):
+                for m in _LABELS_PATTERN.finditer(general_info_text):
+                    labelled_values.setdefault(_LABEL_KEYS[m.group('label').lower()], m.group('value').strip())
+
             def search_label(label: str) -> str:
-                import re
-                rx = re.compile(rf"{label}\s*[:\-]\s*(.+)", re.IGNORECASE)
-                m = rx.search(general_info_text)
-                return m.group(1).strip() if m else ''
+                return labelled_values.get(label, '')
 
             out['name'] = search_label('Nombre del Curso')
             out['id'] = search_label('Código del curso')
@@ -118,9 +287,7 @@ class UPCSyllabusParser:
                 out['weeks'] = 16
             
             # Handle areas that might span multiple lines
-            import re
-            rx = re.compile(r"\n:\s*(?P<area_1>[^\n]+)\nÁrea o programa[ \t]*(?P<area_2>[^\n]*)\n", re.MULTILINE)
-            if m := rx.search(general_info_text):
+            if m := _AREAS_PATTERN.search(general_info_text):
                 careers = m.group('area_1') if not m.group('area_2') else m.group('area_1') + ' ' + m.group('area_2')
                 out['areas'] = [area.strip() for area in careers.split(',') if area.strip()]
             else:
@@ -134,36 +301,75 @@ class UPCSyllabusParser:
                 
             return out
         
-        result = parse_general_info(text)
+        sections = self._index_sections(text)
+        result = parse_general_info(sections.get("I. INFORMACIÓN GENERAL", ""))
         result['units_table'] = tables.get('units', [])
         result['assessments_table'] = tables.get('assessments', [])
         
         return result
     
+    def _index_sections(self, text_pages: List[str]) -> Dict[str, str]:
+        """Split the syllabus text into its sections in a single pass over the lines"""
+        sections = {}
+        current_name, current_lines = None, []
+        for page in text_pages:
+            for line in page.split("\n"):
+                if line.strip() in _SECTION_NAMES_SET:
+                    # A repeated title keeps its first occurrence
+                    if current_name:
+                        sections.setdefault(current_name, "\n".join(current_lines) + "\n")
+                    current_name, current_lines = line.strip(), []
+                current_lines.append(line)
+        if current_name:
+            sections.setdefault(current_name, "\n".join(current_lines) + "\n")
+        return sections
+
     def _parse_bullet_list(self, text: str) -> List[str]:
         """Parse bullet list from text"""
-        import re
-        return [item.strip() for item in re.split(r"[\uf0b7•,]", text) if item.strip()]
+        items = text.translate(_BULLET_TRANSLATION).split(_BULLET_SEPARATOR)
+        return [item.strip() for item in items if item.strip()]
+
+# Fechas usadas cuando el periodo no figura en config.json
+_DEFAULT_PERIOD_DATES = (date(2025, 8, 25), date(2025, 12, 6))
+
+# Lectura en bloque (en C) de los atributos que se serializan
+_COURSE_FIELDS = attrgetter('metadata', 'name', 'faculty', 'credits', 'total_weeks', 'areas', 'units', 'assessments')
+_UNIT_FIELDS = attrgetter('number', 'title', 'achievement', 'week_range', 'syllabus', 'activities')
+_ASSESSMENT_FIELDS = attrgetter('name', 'code', 'weight', 'week')
 
 class JSONRepository:
-    def __init__(self, base_path: Path):
+    def __init__(self, base_path: Path, config_path: Path = Path("config.json")):
         self.base_path = base_path
         self.base_path.mkdir(parents=True, exist_ok=True)
+        self._period_dates = self._load_period_dates(config_path)
+
+    def _load_period_dates(self, config_path: Path) -> Dict[str, Tuple[date, date]]:
+        """Read config.json once and parse the start/end date of each period"""
+        try:
+            config_data = _loads(config_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        return {
+            period: (date.fromisoformat(dates['start_date']), date.fromisoformat(dates['end_date']))
+            for period, dates in config_data.items()
+        }
 
     def save(self, course: Course) -> None:
-        import json
         filename = f"{course.name or 'unknown'}-{course.metadata.nrc or 'no-nrc'}.json"
         filepath = self.base_path / filename
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self._to_dict(course), f, ensure_ascii=False, indent=2)
+        filepath.write_bytes(_dumps(self._to_dict(course)))
+
+    def save_many(self, courses: List[Course], filename: str = "all_courses.json") -> Path:
+        """Save all courses in a single compact JSON file; indentation only adds size and encoding time here"""
+        filepath = self.base_path / filename
+        filepath.write_bytes(_dumps([self._to_dict(course) for course in courses], indent=False))
+        return filepath
 
     def find_by_id(self, course_id: str) -> Course | None:
-        import json
-        for filepath in self.base_path.glob(f"{course_id}_*.json"):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return self._from_dict(data)
-        return None
+        filepath = next(self.base_path.glob(f"{course_id}_*.json"), None)
+        if filepath is None:
+            return None
+        return self._from_dict(_loads(filepath.read_bytes()))
 
     def find_by_period(self, period: str) -> List[Course]:
         # Implementación real
@@ -171,64 +377,50 @@ class JSONRepository:
 
     def _to_dict(self, course: Course) -> Dict:
         """Serialize Course to dictionary"""
+        metadata, name, faculty, credits, weeks, areas, units, assessments = _COURSE_FIELDS(course)
+        period = metadata.period
         return {
-            "id": course.metadata.course_id,
-            "name": course.name,
-            "period": course.metadata.period,
-            "faculty": course.faculty,
-            "credits": course.credits,
-            "weeks": course.total_weeks,
-            "area": course.areas,
-            "nrc": course.metadata.nrc,
-            "units": [self._unit_to_dict(u) for u in course.units],
-            "assessments": [self._assessment_to_dict(a) for a in course.assessments]
+            "id": metadata.course_id,
+            "name": name,
+            "period": period,
+            "faculty": faculty,
+            "credits": credits,
+            "weeks": weeks,
+            "area": areas,
+            "nrc": metadata.nrc,
+            "units": [self._unit_to_dict(u, period) for u in units],
+            "assessments": [self._assessment_to_dict(a, period) for a in assessments]
         }
     
-    def _unit_to_dict(self, unit) -> Dict:
-        """Serialize Unit to dictionary with date calculation"""
-        from datetime import date, timedelta
-        import json
-        
-        # Load config for date calculation
-        try:
-            with open("config.json") as f:
-                config_data = json.load(f)
-            
-            # Extract period from unit (assuming it's available in context)
-            # For now, we'll use a default period - this could be improved
-            period_parts = unit.week_range  # This is a simplification
-            
-            # Calculate dates based on week range
-            # This is a simplified version - in production you'd want proper date handling
-            start_week, end_week = unit.week_range
-            
-        except:
-            # Fallback if config is not available
-            pass
-            
+    def _unit_to_dict(self, unit, period: str) -> Dict:
+        """Serialize Unit to dictionary with the period dates from config"""
+        start_date, end_date = self._period_dates.get(period, _DEFAULT_PERIOD_DATES)
+        number, title, achievement, (initial_week, last_week), syllabus, activities = _UNIT_FIELDS(unit)
         return {
-            'number': unit.number,
-            'title': unit.title,
-            'achievement': unit.achievement,
-            'initial_week': unit.week_range[0],
-            'last_week': unit.week_range[1],
-            'initial_date': '2025-08-25',  # Simplified - should calculate from config
-            'last_date': '2025-12-06',     # Simplified - should calculate from config
-            'syllabus': unit.syllabus,
-            'activities': unit.activities,
+            'number': number,
+            'title': title,
+            'achievement': achievement,
+            'initial_week': initial_week,
+            'last_week': last_week,
+            'initial_date': start_date.isoformat(),
+            'last_date': end_date.isoformat(),
+            'syllabus': syllabus,
+            'activities': activities,
             'exams': [],  # Unit doesn't store exams in new structure
             'bibliography': []  # Unit doesn't store bibliography in new structure
         }
     
-    def _assessment_to_dict(self, assessment) -> Dict:
+    def _assessment_to_dict(self, assessment, period: str) -> Dict:
         """Serialize Assessment to dictionary"""
+        start_date, end_date = self._period_dates.get(period, _DEFAULT_PERIOD_DATES)
+        name, code, weight, week = _ASSESSMENT_FIELDS(assessment)
         return {
-            'name': assessment.name,
-            'abrev': assessment.code,
-            'weight': assessment.weight,
-            'week': assessment.week,
-            'initial_date': '2025-08-25',  # Simplified - should calculate from config
-            'last_date': '2025-12-06'      # Simplified - should calculate from config
+            'name': name,
+            'abrev': code,
+            'weight': weight,
+            'week': week,
+            'initial_date': start_date.isoformat(),
+            'last_date': end_date.isoformat()
         }
 
     def _from_dict(self, data: Dict) -> Course:
@@ -1,44 +1,82 @@
 """
 Orquestador del pipeline ETL y configuración
 """
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from etl_domain import Course, CourseMetadata
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+from etl_domain import Course, CourseMetadata, Unit, Assessment
 from etl_application import PDFExtractor, SyllabusParser, Repository
+from etl_infrastructure import PDFPlumberExtractor, PDFiumExtractor, CachingExtractor, UPCSyllabusParser, JSONRepository
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+import fnmatch
 import logging
+import os
+import re
+
+# Patrones precompilados para el parsing de las tablas
+_UNIT_TITLE_PATTERN = re.compile(r"^Unidad n\. (?P<numero>\d+): (?P<titulo>.+)")
+_WEEK_RANGE_PATTERN = re.compile(r"Semana (?P<semana1>[\d,\s-]+)\s*-\s*(?P<semana2>[\d,\s-]+)")
+_BULLET_SEPARATOR = "\uf0b7"
+_BULLET_TRANSLATION = str.maketrans({"•": _BULLET_SEPARATOR})
+_SYLLABUS_FILE_PATTERN = re.compile(fnmatch.translate("UG-*_1A*-*.pdf"))
+_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def _init_worker_logging(logger_name: str, level: int) -> None:
+    """Repeat the logging setup in a worker process; spawned workers (Windows, macOS) do not inherit it"""
+    logging.basicConfig(level=logging.INFO, format=_LOG_FORMAT)
+    logging.getLogger(logger_name).setLevel(level)
 
 class ETLPipeline:
-    def __init__(self, extractor: PDFExtractor, parser: SyllabusParser, repository: Repository, logger: Optional[logging.Logger] = None):
+    def __init__(self, extractor: PDFExtractor, parser: SyllabusParser, repository: Repository, logger: Optional[logging.Logger] = None, max_workers: Optional[int] = None,
+                 save_course_files: bool = True):
         self.extractor = extractor
         self.parser = parser
         self.repository = repository
         self.logger = logger or logging.getLogger(__name__)
+        self.max_workers = max_workers or os.cpu_count()
+        self.save_course_files = save_course_files
 
     def process_syllabus(self, filepath: Path) -> Optional[Course]:
         try:
-            self.logger.info(f"Extracting: {filepath.name}")
-            text = self.extractor.extract_text(filepath)
-            tables = self.extractor.extract_tables(filepath)
+            self.logger.debug(f"Extracting: {filepath.name}")
+            text, tables = self.extractor.extract(filepath)
             metadata = self.parser.parse_metadata(filepath.name)
             content = self.parser.parse_content(text, tables)
             course = self._build_course(metadata, content)
-            self.repository.save(course)
-            self.logger.info(f"Saved course: {course.metadata.course_id}")
+            if self.save_course_files:
+                self.repository.save(course)
+                self.logger.debug(f"Saved course: {course.metadata.course_id}")
             return course
         except Exception as e:
             self.logger.error(f"Error processing {filepath}: {e}")
             return None
 
+    def _process_syllabus_entry(self, filepath: Path) -> Tuple[Path, Optional[Course]]:
+        """Process one syllabus and return it with its path, so the main process can name skipped files"""
+        return filepath, self.process_syllabus(filepath)
+
     def process_directory(self, directory: Path) -> List[Course]:
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        pdf_files = list(directory.rglob("UG-*_1A*-*.pdf"))
-        self.logger.info(f"Found {len(pdf_files)} PDF files")
         processed_courses = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {executor.submit(self.process_syllabus, pdf): pdf for pdf in pdf_files}
-            for future in as_completed(futures):
-                if course := future.result():
+        done = 0
+        # PDF parsing is CPU-bound pure Python, so it runs in a process pool
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker_logging,
+                                 initargs=(self.logger.name, self.logger.level)) as executor:
+            # The directory walk is fed straight to the pool, so workers start on the first chunks while it continues
+            results = executor.map(self._process_syllabus_entry, self._find_syllabi(directory), chunksize=4)
+            # Progress is reported from the main process as results arrive, not from the workers
+            for done, (pdf, course) in enumerate(results, start=1):
+                if course:
                     processed_courses.append(course)
+                    action = "Saved course" if self.save_course_files else "Parsed course"
+                    self.logger.info(f"[{done}] {action}: {course.metadata.course_id}")
+                else:
+                    self.logger.info(f"[{done}] Skipped: {pdf.name}")
+        self.logger.info(f"Processed {done} PDF files")
         
         # Save all courses in a single file
         if processed_courses:
@@ -49,37 +87,37 @@ class ETLPipeline:
         
         return processed_courses
     
+    def _find_syllabi(self, directory: Path) -> Iterator[Path]:
+        """Recursively yield the syllabus PDFs under directory using os.scandir"""
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.endswith(".pdf") and _SYLLABUS_FILE_PATTERN.match(entry.name):
+                            yield Path(entry.path)
+            except OSError as e:
+                # An unreadable directory is skipped; the rest of the batch goes on
+                self.logger.warning(f"Skipping directory {current}: {e}")
+
     def _save_all_courses(self, courses: List[Course]) -> None:
         """Save all courses in a single JSON file"""
-        import json
-        all_courses_data = [self.repository._to_dict(course) for course in courses]
-        all_courses_path = self.repository.base_path / 'all_courses.json'
-        
-        with open(all_courses_path, 'w', encoding='utf-8') as f:
-            json.dump(all_courses_data, f, ensure_ascii=False, indent=4)
-        
+        all_courses_path = self.repository.save_many(courses, 'all_courses.json')
         self.logger.info(f'All courses saved to: {all_courses_path}')
     
     def _generate_weekly_calendar(self, courses: List[Course]) -> None:
         """Generate a weekly calendar as PDF showing all assessments across courses"""
-        from reportlab.lib.pagesizes import letter
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        
         # Collect all assessments with course info
-        weekly_assessments = {}
+        weekly_assessments = defaultdict(list)
         
         for course in courses:
             course_abbrev = course.metadata.course_id
             for assessment in course.assessments:
-                week = assessment.week
-                if week not in weekly_assessments:
-                    weekly_assessments[week] = []
-                
                 assessment_text = f"•{course_abbrev}: {assessment.name} ({assessment.weight}%)"
-                weekly_assessments[week].append(assessment_text)
+                weekly_assessments[assessment.week].append(assessment_text)
         
         # Create PDF
         calendar_path = self.repository.base_path / 'weekly_calendar.pdf'
@@ -117,8 +155,7 @@ class ETLPipeline:
         # Prepare table data
         table_data = [['Semana', 'Contenido']]  # Header
         
-        for week in sorted(weekly_assessments.keys()):
-            content_lines = weekly_assessments[week]
+        for week, content_lines in sorted(weekly_assessments.items()):
             content_text = '\n'.join(content_lines)  # Use newline instead of <br/>
             table_data.append([str(week), content_text])
         
@@ -148,8 +185,6 @@ class ETLPipeline:
 
     def _build_course(self, metadata: CourseMetadata, content: Dict) -> Course:
         """Build Course object from metadata and parsed content"""
-        from etl_domain import Unit, Assessment
-        
         # Parse units from table
         units = self._parse_units_from_table(content.get('units_table', []), metadata.period)
         
@@ -169,57 +204,63 @@ class ETLPipeline:
     
     def _parse_units_from_table(self, table: List[List[str]], period: str) -> List:
         """Parse units from raw table data"""
-        from etl_domain import Unit
-        import re
-        
         if not table:
             return []
             
         def clean_table_structure(table: List[List[str]]) -> List[List[str]]:
-            """Clean table by removing empty rows and combining split rows"""
-            table = table.copy()
-            
-            def join_with_previous(index: int):
-                if index <= 0 or index >= len(table):
-                    return
-                prev_row = table[index-1]
-                curr_row = table[index]
+            """Clean table by combining split rows in a single forward pass"""
+            def merge_rows(prev_row: List[str], curr_row: List[str]) -> List[str]:
                 new_row = [
                     (prev.strip() + ' ' + curr.strip()).strip() if curr else prev
                     for prev, curr in zip(prev_row, curr_row)
                 ]
                 if len(curr_row) > len(prev_row):
                     new_row.extend(curr_row[len(prev_row):])
-                table[index-1] = new_row
-                del table[index]
+                return new_row
             
-            i = 0
-            while i < len(table):
-                if not table[i][0].startswith("Unidad n."):
-                    raise ValueError(f"Invalid unit title format: {table[i][0]}")
-                i += 1
-                if i < len(table) and not table[i][0].startswith("COMPETENCIA (S):"):
-                    raise ValueError(f"Invalid competition format: {table[i][0]}")
-                i += 1
-                while i < len(table) and not table[i][0].startswith("LOGRO DE LA UNIDAD:"):
-                    if i == len(table)-1:
-                        raise ValueError(f"Invalid achievement format: {table[i][0]}")
-                    join_with_previous(i)
-                i += 1
-                while i < len(table) and not table[i][0].startswith("SEMANA"):
-                    if i == len(table)-1:
-                        raise ValueError(f"Invalid header format: {table[i]}")
-                    join_with_previous(i)
-                i += 1
-                if i < len(table) and not table[i][0].startswith("Semana"):
-                    raise ValueError(f"Invalid week format: {table[i][0] if i < len(table) else 'EOF'}")
-                i += 1
-                while i < len(table) and not table[i][0].startswith("Unidad n."):
-                    join_with_previous(i)
-            return table
+            # Cada unidad es: título, competencia, logro, cabecera y fila de semanas;
+            # las filas partidas entre ellas se unen a la fila anterior
+            cleaned = []
+            state = "title"
+            last_index = len(table) - 1
+            for i, row in enumerate(table):
+                cell = row[0]
+                if state == "title":
+                    if not cell.startswith("Unidad n."):
+                        raise ValueError(f"Invalid unit title format: {cell}")
+                    state = "competence"
+                elif state == "competence":
+                    if not cell.startswith("COMPETENCIA (S):"):
+                        raise ValueError(f"Invalid competition format: {cell}")
+                    state = "achievement"
+                elif state == "achievement":
+                    if not cell.startswith("LOGRO DE LA UNIDAD:"):
+                        if i == last_index:
+                            raise ValueError(f"Invalid achievement format: {cell}")
+                        cleaned[-1] = merge_rows(cleaned[-1], row)
+                        continue
+                    state = "header"
+                elif state == "header":
+                    if not cell.startswith("SEMANA"):
+                        if i == last_index:
+                            raise ValueError(f"Invalid header format: {row}")
+                        cleaned[-1] = merge_rows(cleaned[-1], row)
+                        continue
+                    state = "week"
+                elif state == "week":
+                    if not cell.startswith("Semana"):
+                        raise ValueError(f"Invalid week format: {cell}")
+                    state = "details"
+                elif cell.startswith("Unidad n."):
+                    state = "competence"
+                else:
+                    cleaned[-1] = merge_rows(cleaned[-1], row)
+                    continue
+                cleaned.append(row)
+            return cleaned
         
         def parse_title(line: str) -> tuple[int, str]:
-            match = re.match(r"^Unidad n\. (?P<numero>\d+): (?P<titulo>.+)", line)
+            match = _UNIT_TITLE_PATTERN.match(line)
             if match:
                 number = int(match.group("numero"))
                 title = match.group("titulo")
@@ -228,7 +269,7 @@ class ETLPipeline:
 
         def parse_week_row(row: List[str]) -> tuple:
             row = [field.replace("\n", " ") for field in row]
-            parsed = re.match(r"Semana (?P<semana1>[\d,\s-]+)\s*-\s*(?P<semana2>[\d,\s-]+)", row[0])
+            parsed = _WEEK_RANGE_PATTERN.match(row[0])
             if parsed:
                 week1 = int(parsed.group("semana1"))
                 week2 = int(parsed.group("semana2"))
@@ -265,8 +306,6 @@ class ETLPipeline:
     
     def _parse_assessments_from_table(self, table: List[List[str]], period: str) -> List:
         """Parse assessments from raw table data"""
-        from etl_domain import Assessment
-        
         if not table:
             return []
             
@@ -284,15 +323,16 @@ class ETLPipeline:
             name, code = row[0].split('-', 1) if '-' in row[0] else (row[0], '')
             code = code.strip()
             
-            try:
-                week = int(row[3])
-            except (ValueError, TypeError):
+            # Week and weight must be plain decimal numbers
+            if not row[3].isdecimal():
                 self.logger.warning(f"Invalid week value '{row[3]}' in exam '{name}'. Skipping.")
                 continue
-                
-            try:
-                weight = float(row[2].rstrip('%'))
-            except (ValueError, TypeError):
+            week = int(row[3])
+            
+            weight_text = row[2].rstrip('%').strip()
+            if weight_text.replace('.', '', 1).isdecimal():
+                weight = float(weight_text)
+            else:
                 self.logger.warning(f"Invalid weight value '{row[2]}' in exam '{name}'. Setting to 0.")
                 weight = 0.0
             
@@ -310,17 +350,28 @@ class ETLPipeline:
     
     def _parse_bullet_list(self, text: str) -> List[str]:
         """Parse bullet list from text"""
-        import re
-        return [item.strip() for item in re.split(r"[\uf0b7•]", text) if item.strip()]
+        items = text.translate(_BULLET_TRANSLATION).split(_BULLET_SEPARATOR)
+        return [item.strip() for item in items if item.strip()]
 
 class PipelineFactory:
     @staticmethod
-    def create_default_pipeline(output_dir: Path) -> ETLPipeline:
-        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        from etl_infrastructure import PDFPlumberExtractor, UPCSyllabusParser, JSONRepository
+    def create_default_pipeline(output_dir: Path, max_workers: Optional[int] = None, extractor: str = "pdfplumber",
+                                cache_dir: Optional[Path] = Path(".etl_cache"), verbose: bool = False,
+                                save_course_files: bool = True) -> ETLPipeline:
+        logging.basicConfig(level=logging.INFO, format=_LOG_FORMAT)
+        # Solo el logger del ETL pasa a DEBUG; en la raíz activaría también el debug de pdfminer
+        logger = logging.getLogger("ETL")
+        if verbose:
+            logger.setLevel(logging.DEBUG)
+        extractors = {"pdfplumber": PDFPlumberExtractor, "pdfium": PDFiumExtractor}
+        pdf_extractor = extractors[extractor]()
+        if cache_dir is not None:
+            pdf_extractor = CachingExtractor(pdf_extractor, cache_dir)
         return ETLPipeline(
-            extractor=PDFPlumberExtractor(),
+            extractor=pdf_extractor,
             parser=UPCSyllabusParser(),
             repository=JSONRepository(output_dir),
-            logger=logging.getLogger("ETL")
+            logger=logger,
+            max_workers=max_workers,
+            save_course_files=save_course_files
         )